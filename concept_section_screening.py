@@ -1,11 +1,14 @@
 import os
-import json
 import logging
+from collections import Counter, deque
+from itertools import islice
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 from typing import List, Dict
-from io import StringIO
+import json_io
 
 # 配置日志
 logging.basicConfig(
@@ -18,6 +21,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 请求重试策略：限流及服务端错误时指数退避重试
+_RETRY = Retry(
+    total=3,
+    backoff_factor=1.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=['GET']
+)
+_ADAPTER = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=_RETRY)
+
+# 复用HTTP连接，避免每次请求重新握手
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'Referer': 'https://data.eastmoney.com/',
+})
+_SESSION.mount('https://', _ADAPTER)
+
+# 概念板块数据字段、对应的API字段及默认值
+_CONCEPT_FIELDS = (
+    ('code', 'f12', ''),
+    ('name', 'f14', ''),
+    ('current_price', 'f2', 0),
+    ('change_rate', 'f3', 0),
+    ('main_inflow', 'f62', 0),
+    ('main_inflow_ratio', 'f184', 0),
+    ('super_large_inflow', 'f66', 0),
+    ('super_large_inflow_ratio', 'f69', 0),
+    ('large_inflow', 'f72', 0),
+    ('large_inflow_ratio', 'f75', 0),
+    ('medium_inflow', 'f78', 0),
+    ('medium_inflow_ratio', 'f81', 0),
+    ('small_inflow', 'f84', 0),
+    ('small_inflow_ratio', 'f87', 0),
+    ('max_stock', 'f204', ''),
+    ('max_stock_code', 'f205', ''),
+    ('datetime', 'f124', ''),
+)
+_CONCEPT_FIELD_IDS = [field_id for _, field_id, _ in _CONCEPT_FIELDS]
+_CONCEPT_FIELD_MAP = {field_id: key for key, field_id, _ in _CONCEPT_FIELDS}
+# 文本字段缺失时的默认值
+_CONCEPT_TEXT_DEFAULTS = {key: default for key, _, default in _CONCEPT_FIELDS if default != 0}
+# 默认值为0的字段需要转换为浮点数
+_CONCEPT_NUMERIC_KEYS = tuple(key for key, _, default in _CONCEPT_FIELDS if default == 0)
+
+# 东方财富概念板块资金流向接口
+_URL = "https://push2.eastmoney.com/api/qt/clist/get"
+_PARAMS = {
+    'pn': 1,  # 页码
+    'pz': 10,  # 每页数量，只取前十
+    'po': 1,  # 排序方式
+    'np': 1,  # 
+    'ut': 'bd1d9ddb04089700cf9c27f6f7426281',
+    'fltt': 2,
+    'invt': 2,
+    'fid': 'f62',  # 主力净流入排序
+    'fs': 'm:90 t:3',  # 概念板块
+    'fields': ','.join(_CONCEPT_FIELD_IDS),
+    '_': '1639125329869'
+}
+
 def get_top_concept_sections() -> List[Dict]:
     """
     获取前十概念板块数据
@@ -28,73 +91,31 @@ def get_top_concept_sections() -> List[Dict]:
     logger.info("开始获取概念板块资金流向排行前十")
     
     try:
-        # 使用东方财富API接口获取概念板块数据
-        url = "https://push2.eastmoney.com/api/qt/clist/get"
-        params = {
-            'pn': 1,  # 页码
-            'pz': 20,  # 每页数量
-            'po': 1,  # 排序方式
-            'np': 1,  # 
-            'ut': 'bd1d9ddb04089700cf9c27f6f7426281',
-            'fltt': 2,
-            'invt': 2,
-            'fid': 'f62',  # 主力净流入排序
-            'fs': 'm:90 t:3',  # 概念板块
-            'fields': 'f12,f14,f2,f3,f62,f184,f66,f69,f72,f75,f78,f81,f84,f87,f204,f205,f124',
-            '_': '1639125329869'
-        }
+        # 使用东方财富API接口获取概念板块数据，重试由连接池的Retry策略负责
+        response = _SESSION.get(_URL, params=_PARAMS, timeout=30)
+        response.raise_for_status()
+        logger.debug("响应压缩方式: %s", response.headers.get('Content-Encoding'))
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-            'Referer': 'https://data.eastmoney.com/',
-        }
-        
-        # 添加重试机制
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, params=params, headers=headers, timeout=30)
-                response.raise_for_status()
-                break
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"第{attempt + 1}次请求失败，重试中...")
-                    import time
-                    time.sleep(2)
-                else:
-                    raise e
-        
-        data = response.json()
+        # 直接解析响应字节，跳过requests的字符集探测
+        data = json_io.loads(response.content)
         
         if data.get('rc') != 0 or not data.get('data', {}).get('diff'):
             logger.error("API返回数据格式错误")
             return []
         
-        # 处理API数据
-        concepts = []
-        for item in data['data']['diff'][:10]:  # 只取前十
-            concept = {
-                'code': item.get('f12', ''),
-                'name': item.get('f14', ''),
-                'current_price': float(item.get('f2', 0)),
-                'change_rate': float(item.get('f3', 0)),
-                'main_inflow': float(item.get('f62', 0)),
-                'main_inflow_ratio': float(item.get('f184', 0)),
-                'super_large_inflow': float(item.get('f66', 0)),
-                'super_large_inflow_ratio': float(item.get('f69', 0)),
-                'large_inflow': float(item.get('f72', 0)),
-                'large_inflow_ratio': float(item.get('f75', 0)),
-                'medium_inflow': float(item.get('f78', 0)),
-                'medium_inflow_ratio': float(item.get('f81', 0)),
-                'small_inflow': float(item.get('f84', 0)),
-                'small_inflow_ratio': float(item.get('f87', 0)),
-                'max_stock': item.get('f204', ''),
-                'max_stock_code': item.get('f205', ''),
-                'datetime': item.get('f124', '')
-            }
-            concepts.append(concept)
+        # 处理API数据，按固定字段表整体投影为DataFrame
+        frame = (pd.DataFrame(data['data']['diff'], dtype=object)
+                 .reindex(columns=_CONCEPT_FIELD_IDS)
+                 .rename(columns=_CONCEPT_FIELD_MAP))
+        frame = frame.fillna(_CONCEPT_TEXT_DEFAULTS)
+        
+        # 数值字段整列转换，停牌等返回的'-'记为0
+        for key in _CONCEPT_NUMERIC_KEYS:
+            frame[key] = pd.to_numeric(frame[key], errors='coerce').fillna(0.0).astype(float)
+        concepts = frame.to_dict('records')
         
-        logger.info(f"成功获取前十概念板块: {[c['name'] for c in concepts]}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("成功获取前十概念板块: %s", [c['name'] for c in concepts])
         
         # 保存数据
         save_concept_data(concepts)
@@ -102,231 +123,29 @@ def get_top_concept_sections() -> List[Dict]:
         return concepts
         
     except requests.RequestException as e:
-        logger.error(f"获取概念板块数据失败: {e}")
+        logger.error("获取概念板块数据失败: %s", e)
+        return []
+    except ValueError as e:
+        logger.error("解析概念板块数据失败: %s", e)
         return []
-        
-    logger.info(f"找到概念板块表格，形状: {concept_table.shape}")
-    logger.info(f"表格列名: {list(concept_table.columns)}")
-    
-    # 处理表格数据
-    top_concepts = process_concept_table(concept_table)
-    
-    # 只取前十
-    top_10 = top_concepts[:10]
-    
-    logger.info(f"成功获取前十概念板块: {[c['name'] for c in top_10]}")
-    
-    # 保存数据
-    save_concept_data(top_10)
-    
-    return top_10
-
-def process_concept_table(table: pd.DataFrame) -> List[Dict]:
-    """
-    处理概念板块表格数据
-    
-    Args:
-        table: pandas DataFrame
-        
-    Returns:
-        List[Dict]: 处理后的概念板块数据
-    """
-    concepts = []
-    
-    # 重命名列名，使其更标准化
-    table = standardize_column_names(table)
-    
-    # 遍历表格行
-    for index, row in table.iterrows():
-        try:
-            # 跳过表头行或空行
-            if pd.isna(row.iloc[0]) or str(row.iloc[0]).strip() == '':
-                continue
-                
-            # 提取数据
-            concept_data = extract_concept_data(row)
-            
-            if concept_data and concept_data['name']:
-                concepts.append(concept_data)
-                
-        except Exception as e:
-            logger.warning(f"处理表格行失败: {e}")
-            continue
-    
-    return concepts
-
-def standardize_column_names(table: pd.DataFrame) -> pd.DataFrame:
-    """
-    标准化列名
-    
-    Args:
-        table: pandas DataFrame
-        
-    Returns:
-        pd.DataFrame: 列名标准化后的表格
-    """
-    # 创建列名映射
-    column_mapping = {}
-    
-    for col in table.columns:
-        col_str = str(col).strip()
-        
-        # 名称列
-        if any(keyword in col_str for keyword in ['名称', '板块', '概念']):
-            column_mapping[col] = 'name'
-        
-        # 涨跌幅列
-        elif any(keyword in col_str for keyword in ['涨跌幅', '涨跌']):
-            column_mapping[col] = 'change_rate'
-        
-        # 主力净流入列
-        elif any(keyword in col_str for keyword in ['主力净流入', '主力流入']):
-            column_mapping[col] = 'main_inflow'
-        
-        # 超大单净流入列
-        elif any(keyword in col_str for keyword in ['超大单净流入', '超大单流入']):
-            column_mapping[col] = 'super_large_inflow'
-        
-        # 大单净流入列
-        elif any(keyword in col_str for keyword in ['大单净流入', '大单流入']):
-            column_mapping[col] = 'large_inflow'
-        
-        # 中单净流入列
-        elif any(keyword in col_str for keyword in ['中单净流入', '中单流入']):
-            column_mapping[col] = 'medium_inflow'
-        
-        # 小单净流入列
-        elif any(keyword in col_str for keyword in ['小单净流入', '小单流入']):
-            column_mapping[col] = 'small_inflow'
-        
-        # 主力净流入最大股列
-        elif any(keyword in col_str for keyword in ['主力净流入最大股', '最大股']):
-            column_mapping[col] = 'max_stock'
-    
-    # 重命名列
-    if column_mapping:
-        table = table.rename(columns=column_mapping)
-    
-    return table
 
-def extract_concept_data(row: pd.Series) -> Dict:
+def to_frame(concepts: List[Dict]) -> pd.DataFrame:
     """
-    从表格行中提取概念板块数据
+    将概念板块数据转换为DataFrame，重复出现的文本列使用分类类型
     
     Args:
-        row: pandas Series
+        concepts: 概念板块数据列表
         
     Returns:
-        Dict: 概念板块数据
-    """
-    try:
-        # 获取名称
-        name = ''
-        if 'name' in row.index:
-            name = str(row['name']).strip() if not pd.isna(row['name']) else ''
-        else:
-            # 如果没有name列，尝试第一列
-            name = str(row.iloc[1]).strip() if len(row) > 1 else ''
-        
-        # 跳过无效名称
-        if not name or name in ['名称', '板块', '概念', 'nan']:
-            return {}
-        
-        # 获取涨跌幅
-        change_rate = 0.0
-        if 'change_rate' in row.index:
-            change_rate = parse_percentage(str(row['change_rate']))
-        elif len(row) > 2:
-            change_rate = parse_percentage(str(row.iloc[2]))
-        
-        # 获取主力净流入
-        main_inflow = 0.0
-        if 'main_inflow' in row.index:
-            main_inflow = parse_money_value(str(row['main_inflow']))
-        
-        # 获取超大单净流入
-        super_large_inflow = 0.0
-        if 'super_large_inflow' in row.index:
-            super_large_inflow = parse_money_value(str(row['super_large_inflow']))
-        elif len(row) > 4:
-            super_large_inflow = parse_money_value(str(row.iloc[4]))
-        
-        # 获取大单净流入
-        large_inflow = 0.0
-        if 'large_inflow' in row.index:
-            large_inflow = parse_money_value(str(row['large_inflow']))
-        elif len(row) > 6:
-            large_inflow = parse_money_value(str(row.iloc[6]))
-        
-        # 获取中单净流入
-        medium_inflow = 0.0
-        if 'medium_inflow' in row.index:
-            medium_inflow = parse_money_value(str(row['medium_inflow']))
-        
-        # 获取小单净流入
-        small_inflow = 0.0
-        if 'small_inflow' in row.index:
-            small_inflow = parse_money_value(str(row['small_inflow']))
-        
-        # 获取主力净流入最大股
-        max_stock = ''
-        if 'max_stock' in row.index:
-            max_stock = str(row['max_stock']).strip() if not pd.isna(row['max_stock']) else ''
-        elif len(row) > 9:
-            max_stock = str(row.iloc[9]).strip()
-        
-        return {
-            'name': name,
-            'change_rate': change_rate,
-            'main_inflow': main_inflow,
-            'super_large_inflow': super_large_inflow,
-            'large_inflow': large_inflow,
-            'medium_inflow': medium_inflow,
-            'small_inflow': small_inflow,
-            'max_stock': max_stock,
-            'total_inflow': super_large_inflow + large_inflow  # 超大单+大单净流入
-        }
-        
-    except Exception as e:
-        logger.warning(f"提取概念数据失败: {e}")
-        return {}
-
-def parse_percentage(value: str) -> float:
+        pd.DataFrame: 概念板块数据表
     """
-    解析百分比值
+    df = pd.DataFrame(concepts)
     
-    Args:
-        value: 字符串值
-        
-    Returns:
-        float: 百分比数值
-    """
-    try:
-        # 移除百分号并转换为浮点数
-        value = value.replace('%', '').strip()
-        return float(value)
-    except:
-        return 0.0
-
-def parse_money_value(value: str) -> float:
-    """
-    解析金额值（亿元）
+    for col in ['name', 'max_stock', 'max_stock_code']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
     
-    Args:
-        value: 字符串值
-        
-    Returns:
-        float: 金额数值（亿元）
-    """
-    try:
-        # 移除单位并转换为浮点数
-        value = value.replace('亿', '').replace('万', '').strip()
-        # 如果是万元，转换为亿元
-        if '万' in str(value):
-            return float(value) / 10000
-        return float(value)
-    except:
-        return 0.0
+    return df
 
 def save_concept_data(concepts: List[Dict]):
     """
@@ -336,118 +155,128 @@ def save_concept_data(concepts: List[Dict]):
         concepts: 概念板块数据列表
     """
     try:
+        # 本次保存统一使用同一时间
+        now = datetime.now()
         data = {
-            'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'update_time': now.strftime('%Y-%m-%d %H:%M:%S'),
             'concepts': concepts
         }
         
-        with open('concept_section_data.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        json_io.atomic_write_bytes('concept_section_data.json', json_io.dumps(data))
             
-        logger.info(f"概念板块数据已保存到 concept_section_data.json")
+        logger.info("概念板块数据已保存到 concept_section_data.json")
         
         # 更新历史数据
-        update_historical_data(concepts)
+        update_historical_data(concepts, data, now)
         
     except Exception as e:
-        logger.error(f"保存概念板块数据失败: {e}")
+        logger.error("保存概念板块数据失败: %s", e)
 
-def update_historical_data(concepts: List[Dict]):
+def update_historical_data(concepts: List[Dict], current_data: Dict, now: datetime = None):
     """
     更新历史数据，保存最近10天的概念板块信息
     
     Args:
         concepts: 概念板块数据列表
+        current_data: 当前概念板块数据
+        now: 数据更新时间，默认为当前时间
     """
     try:
-        # 读取历史数据
+        # 读取历史数据，只保留最近10天，超出时自动淘汰最早的数据
         history_file = 'concept_section_history.json'
-        if os.path.exists(history_file):
-            with open(history_file, 'r', encoding='utf-8') as f:
-                historical_data = json.load(f)
-        else:
-            historical_data = {'historical_data': {}}
+        entries = deque(_load_history_entries(history_file), maxlen=10)
         
         # 获取当前日期
-        current_date = datetime.now().strftime('%Y-%m-%d')
+        current_date = (now or datetime.now()).strftime('%Y-%m-%d')
         
         # 提取概念名称列表
         concept_names = [concept['name'] for concept in concepts]
         
+        # 同一天重复运行时覆盖当日数据
+        if entries and entries[-1]['date'] == current_date:
+            entries.pop()
+        elif len(entries) == entries.maxlen:
+            logger.info("删除历史数据: %s", entries[0]['date'])
+        
         # 添加今日数据
-        historical_data['historical_data'][current_date] = {
+        entries.append({
             'date': current_date,
             'concepts': concept_names,
             'count': len(concept_names)
-        }
-        
-        # 只保留最近10天的数据
-        dates = sorted(historical_data['historical_data'].keys())
-        if len(dates) > 10:
-            # 删除最早的数据
-            for old_date in dates[:-10]:
-                del historical_data['historical_data'][old_date]
-                logger.info(f"删除历史数据: {old_date}")
+        })
+        historical_data = {'historical_data': list(entries)}
         
         # 保存更新后的历史数据
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(historical_data, f, ensure_ascii=False, indent=2)
+        json_io.atomic_write_bytes(history_file, json_io.dumps(historical_data))
             
-        logger.info(f"历史数据已更新，共保存 {len(historical_data['historical_data'])} 天的数据")
+        logger.info("历史数据已更新，共保存 %d 天的数据", len(historical_data['historical_data']))
         
         # 生成历史统计并更新HTML
-        generate_historical_statistics(historical_data)
+        generate_historical_statistics(historical_data, current_data)
         
     except Exception as e:
-        logger.error(f"更新历史数据失败: {e}")
+        logger.error("更新历史数据失败: %s", e)
 
-def generate_historical_statistics(historical_data: Dict):
+def _load_history_entries(history_file: str) -> List[Dict]:
+    """
+    读取历史数据记录，按日期从早到晚排列
+    
+    Args:
+        history_file: 历史数据文件路径
+        
+    Returns:
+        List[Dict]: 每日概念板块记录列表
+    """
+    if not os.path.exists(history_file):
+        return []
+    
+    with open(history_file, 'rb') as f:
+        entries = json_io.loads(f.read()).get('historical_data', [])
+    
+    # 兼容旧版以日期为键的历史数据格式
+    if isinstance(entries, dict):
+        entries = [entries[date] for date in sorted(entries)]
+    
+    return entries
+
+def generate_historical_statistics(historical_data: Dict, current_data: Dict):
     """
     生成历史统计数据并更新HTML文件
     
     Args:
         historical_data: 历史数据字典
+        current_data: 当前概念板块数据
     """
     try:
         # 统计概念板块出现次数
-        concept_count = {}
-        
-        # 只统计最近5天的数据
-        dates = sorted(historical_data['historical_data'].keys())[-5:]
+        concept_count = Counter()
         
-        for date in dates:
-            concepts = historical_data['historical_data'][date]['concepts']
-            for concept in concepts:
-                concept_count[concept] = concept_count.get(concept, 0) + 1
+        # 只统计最近5天的数据，历史记录已按日期排序
+        entries = historical_data['historical_data']
+        for entry in islice(entries, max(len(entries) - 5, 0), None):
+            concept_count.update(entry['concepts'])
         
-        # 按出现次数排序，取前10
-        sorted_concepts = sorted(concept_count.items(), key=lambda x: x[1], reverse=True)[:10]
+        # 按出现次数取前10
+        sorted_concepts = concept_count.most_common(10)
         
-        logger.info(f"历史统计完成，前5天概念板块出现次数统计: {sorted_concepts}")
+        logger.info("历史统计完成，前5天概念板块出现次数统计: %s", sorted_concepts)
         
         # 更新HTML报告
-        update_html_report(sorted_concepts, historical_data)
+        update_html_report(sorted_concepts, historical_data, current_data)
         
     except Exception as e:
-        logger.error(f"生成历史统计数据失败: {e}")
+        logger.error("生成历史统计数据失败: %s", e)
 
-def update_html_report(sorted_concepts: List, historical_data: Dict):
+def update_html_report(sorted_concepts: List, historical_data: Dict, current_data: Dict):
     """
     更新HTML报告文件
     
     Args:
         sorted_concepts: 排序后的概念板块列表
         historical_data: 历史数据字典
+        current_data: 当前概念板块数据
     """
     try:
-        # 读取当前的概念板块数据
-        current_data_file = 'concept_section_data.json'
-        if os.path.exists(current_data_file):
-            with open(current_data_file, 'r', encoding='utf-8') as f:
-                current_data = json.load(f)
-        else:
-            current_data = {'concepts': []}
-        
         # 生成HTML内容
         html_content = generate_html_content(current_data, sorted_concepts, historical_data)
         
@@ -458,23 +287,10 @@ def update_html_report(sorted_concepts: List, historical_data: Dict):
         logger.info("HTML报告已更新")
         
     except Exception as e:
-        logger.error(f"更新HTML报告失败: {e}")
+        logger.error("更新HTML报告失败: %s", e)
 
-def generate_html_content(current_data: Dict, sorted_concepts: List, historical_data: Dict) -> str:
-    """
-    生成HTML内容
-    
-    Args:
-        current_data: 当前概念板块数据
-        sorted_concepts: 排序后的历史概念板块
-        historical_data: 历史数据字典
-        
-    Returns:
-        str: HTML内容
-    """
-    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    html = f"""
+# 报告页面头部与样式，静态内容不参与格式化
+_HTML_HEAD = """
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -482,73 +298,73 @@ def generate_html_content(current_data: Dict, sorted_concepts: List, historical_
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>概念板块资金流向报告</title>
     <style>
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             margin: 0;
             padding: 20px;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             min-height: 100vh;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             background: white;
             border-radius: 15px;
             box-shadow: 0 20px 40px rgba(0,0,0,0.1);
             overflow: hidden;
-        }}
-        .header {{
+        }
+        .header {
             background: linear-gradient(135deg, #2c3e50, #34495e);
             color: white;
             padding: 20px;
             text-align: center;
-        }}
-        .header h1 {{
+        }
+        .header h1 {
             margin: 0;
             font-size: 1.8em;
             font-weight: 300;
-        }}
-        .header p {{
+        }
+        .header p {
             margin: 8px 0 0 0;
             opacity: 0.8;
             font-size: 0.9em;
-        }}
-        .content {{
+        }
+        .content {
             padding: 20px;
-        }}
-        .section {{
+        }
+        .section {
             margin-bottom: 20px;
-        }}
-        .section h2 {{
+        }
+        .section h2 {
             color: #2c3e50;
             border-bottom: 2px solid #3498db;
             padding-bottom: 6px;
             margin-bottom: 12px;
             font-size: 1.2em;
-        }}
-        .dashboard {{
+        }
+        .dashboard {
             display: grid;
             grid-template-columns: 1fr 1fr;
             gap: 20px;
             margin-bottom: 20px;
-        }}
-        .section {{
+        }
+        .section {
             background: #f8f9fa;
             border-radius: 8px;
             padding: 15px;
             box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-        }}
-        .section h2 {{
+        }
+        .section h2 {
             color: #2c3e50;
             margin: 0 0 12px 0;
             font-size: 1.2em;
             border-bottom: 2px solid #3498db;
             padding-bottom: 6px;
-        }}
-        .table-container {{
+        }
+        .table-container {
             overflow-x: auto;
-        }}
-        .concept-table {{
+        }
+        .concept-table {
             width: 100%;
             border-collapse: collapse;
             font-size: 0.85em;
@@ -556,123 +372,95 @@ def generate_html_content(current_data: Dict, sorted_concepts: List, historical_
             border-radius: 6px;
             overflow: hidden;
             box-shadow: 0 2px 6px rgba(0,0,0,0.1);
-        }}
-        .concept-table th {{
+        }
+        .concept-table th {
             background: linear-gradient(135deg, #3498db, #2980b9);
             color: white;
             padding: 8px 10px;
             text-align: left;
             font-weight: 600;
             font-size: 0.9em;
-        }}
-        .concept-table td {{
+        }
+        .concept-table td {
             padding: 6px 10px;
             border-bottom: 1px solid #ecf0f1;
-        }}
-        .concept-table tr:hover {{
+        }
+        .concept-table tr:hover {
             background-color: #f1f2f6;
-        }}
-        .positive {{
+        }
+        .positive {
             color: #e74c3c;
             font-weight: bold;
-        }}
-        .negative {{
+        }
+        .negative {
             color: #27ae60;
             font-weight: bold;
-        }}
-        .stats-grid {{
+        }
+        .stats-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
             gap: 20px;
             margin-top: 20px;
-        }}
-        .stat-card {{
+        }
+        .stat-card {
             background: linear-gradient(135deg, #f39c12, #e67e22);
             color: white;
             padding: 20px;
             border-radius: 10px;
             text-align: center;
             box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        }}
-        .stat-card h3 {{
+        }
+        .stat-card h3 {
             margin: 0 0 10px 0;
             font-size: 1.2em;
-        }}
-        .stat-card .value {{
+        }
+        .stat-card .value {
             font-size: 2em;
             font-weight: bold;
-        }}
-        .history-table {{
+        }
+        .history-table {
             width: 100%;
             border-collapse: collapse;
             margin-top: 20px;
-        }}
-        .history-table th {{
+        }
+        .history-table th {
             background: linear-gradient(135deg, #9b59b6, #8e44ad);
             color: white;
             padding: 12px;
             text-align: left;
-        }}
-        .history-table td {{
+        }
+        .history-table td {
             padding: 10px 12px;
             border-bottom: 1px solid #ecf0f1;
-        }}
-        .rank-1 {{ background-color: #f1c40f; color: #2c3e50; font-weight: bold; }}
-        .rank-2 {{ background-color: #e67e22; color: white; }}
-        .rank-3 {{ background-color: #e74c3c; color: white; }}
-        .footer {{
+        }
+        .rank-1 { background-color: #f1c40f; color: #2c3e50; font-weight: bold; }
+        .rank-2 { background-color: #e67e22; color: white; }
+        .rank-3 { background-color: #e74c3c; color: white; }
+        .footer {
             background: #34495e;
             color: white;
             text-align: center;
             padding: 20px;
             font-size: 0.9em;
-        }}
+        }
     </style>
 </head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>概念板块资金流向分析</h1>
-            <p>更新时间: {current_time}</p>
-        </div>
-        
-        <div class="content">
-            <div class="dashboard">
-                <!-- 当日概念板块数据 -->
-                <div class="section">
-                    <h2>📊 当日概念板块前十</h2>
-                    <div class="table-container">
-                        <table class="concept-table">
-                            <thead>
-                                <tr>
-                                    <th>排名</th>
-                                    <th>概念板块</th>
-                                    <th>涨跌幅(%)</th>
-                                    <th>主力净流入(万)</th>
-                                    <th>超大单(万)</th>
-                                    <th>大单(万)</th>
-                                    <th>龙头股</th>
-                                </tr>
-                            </thead>
-                            <tbody>
 """
-    
-    # 添加当前数据行
-    for i, concept in enumerate(current_data.get('concepts', []), 1):
-        change_class = 'positive' if concept.get('change_rate', 0) > 0 else 'negative'
-        html += f"""
+
+# HTML报告各部分模板
+_CONCEPT_ROW_TEMPLATE = """
                                 <tr>
-                                    <td>{i}</td>
-                                    <td><strong>{concept.get('name', '')}</strong></td>
-                                    <td class="{change_class}">{concept.get('change_rate', 0):.2f}%</td>
-                                    <td>{concept.get('main_inflow', 0)/10000:.0f}</td>
-                                    <td>{concept.get('super_large_inflow', 0)/10000:.0f}</td>
-                                    <td>{concept.get('large_inflow', 0)/10000:.0f}</td>
-                                    <td>{concept.get('max_stock', '')}</td>
+                                    <td>{rank}</td>
+                                    <td><strong>{name}</strong></td>
+                                    <td class="{change_class}">{change_rate:.2f}%</td>
+                                    <td>{main_inflow:.0f}</td>
+                                    <td>{super_large_inflow:.0f}</td>
+                                    <td>{large_inflow:.0f}</td>
+                                    <td>{max_stock}</td>
                                 </tr>
 """
-    
-    html += """
+
+_HISTORY_TABLE_HEADER = """
                             </tbody>
                         </table>
                     </div>
@@ -693,22 +481,17 @@ def generate_html_content(current_data: Dict, sorted_concepts: List, historical_
                             </thead>
                             <tbody>
 """
-    
-    # 添加历史统计行
-    total_days = min(5, len(historical_data.get('historical_data', {})))
-    for i, (concept, count) in enumerate(sorted_concepts, 1):
-        frequency = f"{(count/total_days)*100:.1f}%" if total_days > 0 else "0%"
-        rank_class = f"rank-{i}" if i <= 3 else ""
-        html += f"""
+
+_HISTORY_ROW_TEMPLATE = """
                         <tr class="{rank_class}">
-                            <td>{i}</td>
+                            <td>{rank}</td>
                             <td><strong>{concept}</strong></td>
                             <td>{count}</td>
                             <td>{frequency}</td>
                         </tr>
 """
-    
-    html += """
+
+_FOOTER_TEMPLATE = """
                             </tbody>
                         </table>
                     </div>
@@ -721,7 +504,7 @@ def generate_html_content(current_data: Dict, sorted_concepts: List, historical_
                 <div class="stats-grid">
                     <div class="stat-card">
                         <h3>历史数据天数</h3>
-                        <div class="value">{len(historical_data.get('historical_data', {}))}</div>
+                        <div class="value">{history_days}</div>
                     </div>
                     <div class="stat-card">
                         <h3>统计天数</h3>
@@ -729,7 +512,7 @@ def generate_html_content(current_data: Dict, sorted_concepts: List, historical_
                     </div>
                     <div class="stat-card">
                         <h3>当前概念板块</h3>
-                        <div class="value">{len(current_data.get('concepts', []))}</div>
+                        <div class="value">{concept_count}</div>
                     </div>
                 </div>
             </div>
@@ -742,8 +525,90 @@ def generate_html_content(current_data: Dict, sorted_concepts: List, historical_
 </body>
 </html>
 """
+
+def generate_html_content(current_data: Dict, sorted_concepts: List, historical_data: Dict) -> str:
+    """
+    生成HTML内容
+    
+    Args:
+        current_data: 当前概念板块数据
+        sorted_concepts: 排序后的历史概念板块
+        historical_data: 历史数据字典
+        
+    Returns:
+        str: HTML内容
+    """
+    # 优先使用当前数据的更新时间
+    current_time = current_data.get('update_time') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    html = _HTML_HEAD + f"""<body>
+    <div class="container">
+        <div class="header">
+            <h1>概念板块资金流向分析</h1>
+            <p>更新时间: {current_time}</p>
+        </div>
+        
+        <div class="content">
+            <div class="dashboard">
+                <!-- 当日概念板块数据 -->
+                <div class="section">
+                    <h2>📊 当日概念板块前十</h2>
+                    <div class="table-container">
+                        <table class="concept-table">
+                            <thead>
+                                <tr>
+                                    <th>排名</th>
+                                    <th>概念板块</th>
+                                    <th>涨跌幅(%)</th>
+                                    <th>主力净流入(万)</th>
+                                    <th>超大单(万)</th>
+                                    <th>大单(万)</th>
+                                    <th>龙头股</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+"""
+    
+    # 逐段收集HTML片段，最后统一拼接
+    parts = [html]
+    
+    # 添加当前数据行
+    concepts = current_data.get('concepts', [])
+    for i, concept in enumerate(concepts, 1):
+        change_rate = concept.get('change_rate', 0)
+        parts.append(_CONCEPT_ROW_TEMPLATE.format(
+            rank=i,
+            name=concept.get('name', ''),
+            change_class='positive' if change_rate > 0 else 'negative',
+            change_rate=change_rate,
+            main_inflow=concept.get('main_inflow', 0) / 10000,
+            super_large_inflow=concept.get('super_large_inflow', 0) / 10000,
+            large_inflow=concept.get('large_inflow', 0) / 10000,
+            max_stock=concept.get('max_stock', '')
+        ))
+    
+    parts.append(_HISTORY_TABLE_HEADER)
+    
+    # 添加历史统计行
+    history_days = len(historical_data.get('historical_data', {}))
+    total_days = min(5, history_days)
+    for i, (concept, count) in enumerate(sorted_concepts, 1):
+        parts.append(_HISTORY_ROW_TEMPLATE.format(
+            rank=i,
+            rank_class=f"rank-{i}" if i <= 3 else "",
+            concept=concept,
+            count=count,
+            frequency=f"{(count/total_days)*100:.1f}%" if total_days > 0 else "0%"
+        ))
+    
+    parts.append(_FOOTER_TEMPLATE.format(
+        history_days=history_days,
+        total_days=total_days,
+        concept_count=len(concepts),
+        current_time=current_time
+    ))
     
-    return html
+    return ''.join(parts)
 
 def main():
     """
@@ -755,12 +620,13 @@ def main():
     top_concepts = get_top_concept_sections()
     
     if top_concepts:
-        logger.info(f"成功获取 {len(top_concepts)} 个概念板块")
-        for i, concept in enumerate(top_concepts, 1):
-            total_inflow = concept.get('super_large_inflow', 0) + concept.get('large_inflow', 0)
-            logger.info(f"{i}. {concept['name']}: 涨跌幅 {concept['change_rate']:.2f}%, "
-                       f"主力净流入 {concept['main_inflow']:.2f}亿, "
-                       f"超大单+大单 {total_inflow:.2f}亿")
+        logger.info("成功获取 %d 个概念板块", len(top_concepts))
+        if logger.isEnabledFor(logging.INFO):
+            for i, concept in enumerate(top_concepts, 1):
+                total_inflow = concept.get('super_large_inflow', 0) + concept.get('large_inflow', 0)
+                logger.info("%d. %s: 涨跌幅 %.2f%%, 主力净流入 %.2f亿, 超大单+大单 %.2f亿",
+                            i, concept['name'], concept['change_rate'],
+                            concept['main_inflow'], total_inflow)
     else:
         logger.error("未能获取概念板块数据")
 
@@ -0,0 +1,67 @@
+"""
+JSON编解码与文件写入的公共工具，供概念板块筛选和连板股票爬取脚本共用
+"""
+import os
+import json
+import tempfile
+
+# 优先使用orjson进行JSON编解码，未安装时使用标准库json
+try:
+    import orjson
+
+    def loads(data):
+        """解析JSON字符串或字节串"""
+        return orjson.loads(data)
+
+    def dumps(obj, indent: bool = True) -> bytes:
+        """将对象序列化为UTF-8编码的JSON字节串"""
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+except ImportError:
+    def loads(data):
+        """解析JSON字符串或字节串"""
+        return json.loads(data)
+
+    def dumps(obj, indent: bool = True) -> bytes:
+        """将对象序列化为UTF-8编码的JSON字节串"""
+        return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+def _target_file_mode(path: str) -> int:
+    """
+    获取写入文件应使用的权限：目标文件已存在时沿用其权限，否则按当前umask计算
+
+    Args:
+        path: 目标文件路径
+
+    Returns:
+        文件权限位
+    """
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def atomic_write_bytes(path: str, data: bytes):
+    """
+    原子写入文件：先写入同目录临时文件并落盘，再替换目标文件
+
+    Args:
+        path: 目标文件路径
+        data: 文件内容
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp创建的文件权限为0600，替换前恢复为目标文件原有权限或按umask的默认权限
+        os.chmod(tmp_path, _target_file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
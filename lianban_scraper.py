@@ -1,13 +1,22 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import json
 import time
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Dict
 import logging
+import argparse
 from bs4 import BeautifulSoup
 import os
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+from collections import Counter
+import json_io
 
 # 配置日志
 logging.basicConfig(
@@ -16,6 +25,115 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class _LoggingRetry(Retry):
+    """每次重试时记录日志，便于观察限流退避"""
+    
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        reason = response.status if response is not None else error
+        logger.info(f"请求重试: {url}，原因: {reason}，剩余次数: {new_retry.total}")
+        return new_retry
+
+# 复用HTTP连接，避免每次请求重新握手
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Connection': 'keep-alive'
+})
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    # 遇到限流(429)和服务端错误时退避重试，并遵守Retry-After
+    max_retries=_LoggingRetry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        respect_retry_after_header=True
+    )
+)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
+# 东方财富板块成分股API
+_STOCK_LIST_URL = "http://push2.eastmoney.com/api/qt/clist/get"
+_STOCK_LIST_PAGE_SIZE = 100
+# 成分股API字段到股票字段的映射：代码、名称、最新价、涨跌幅、涨跌额、成交量、成交额、振幅、换手率、市盈率、市净率、总市值
+_STOCK_LIST_COLUMNS = {
+    'f12': 'code',
+    'f14': 'name',
+    'f2': 'price',
+    'f3': 'change_rate',
+    'f4': 'change_amount',
+    'f5': 'volume',
+    'f6': 'amount',
+    'f7': 'amplitude',
+    'f8': 'turnover_rate',
+    'f39': 'pe_ratio',
+    'f46': 'pb_ratio',
+    'f20': 'market_value'
+}
+# 数值字段的API字段名及对应的股票字段名
+_STOCK_LIST_NUMERIC_IDS = [field for field, name in _STOCK_LIST_COLUMNS.items() if name not in ('code', 'name')]
+_STOCK_LIST_NUMERIC = [_STOCK_LIST_COLUMNS[field] for field in _STOCK_LIST_NUMERIC_IDS]
+# 成分股API未提供的字段的默认值
+_STOCK_LIST_DEFAULTS = {
+    'fund_inflow': 0,  # 需要其他接口获取
+    'lianban_days': 1,  # 默认1天，需要其他接口获取真实连板天数
+    'is_new_stock': False,
+    'first_limit_time': '',
+    'last_limit_time': '',
+    'limit_type': '连板',
+    'is_st': False
+}
+_STOCK_LIST_PARAMS = {
+    'pz': _STOCK_LIST_PAGE_SIZE,  # 每页数量
+    'po': 1,  # 升序
+    'np': 1,  # 
+    'ut': 'bd1d9ddb04089700cf9c27f6f7426281',  # 固定参数
+    'fltt': 2,  # 
+    'invt': 2,  # 
+    'fid': 'f3',  # 按涨跌幅排序
+    'fs': 'b:BK1051',  # 昨日连板板块代码
+    'fields': ','.join(_STOCK_LIST_COLUMNS)  # 只请求解析时用到的字段
+}
+_STOCK_LIST_HEADERS = {
+    'Referer': 'https://data.eastmoney.com/bkzj/BK1051.html',
+    'Accept': '*/*'
+}
+# 分页并发请求数上限，避免触发限流
+_MAX_CONCURRENT_PAGES = 5
+# 主数据源的等待时间（秒），超时后同时启动备用数据源；akshare需扫描全市场行情，耗时通常在10秒左右
+_PRIMARY_DEADLINE = float(os.environ.get('LIANBAN_PRIMARY_DEADLINE', '15'))
+# 限制同时进行的成分股API请求数，多个调用方并发时同样生效
+_REQUEST_SEMAPHORE = threading.BoundedSemaphore(_MAX_CONCURRENT_PAGES)
+
+# 股票名称过滤规则
+_ST_RE = re.compile(r'\*?ST', re.IGNORECASE)
+_SPECIAL_CHAR_RE = re.compile(r'[\*\?\!]')
+# 网页script中股票数据变量的提取模式
+_DATA_VAR_RE = re.compile(r'var\s+\w*data\w*\s*=\s*(\[.*?\]);', re.DOTALL)
+_STOCK_CODE_RE = re.compile(r'\[\s*\{\s*"[^"]*code[^"]*"\s*:\s*"\d{6}"')
+# data/pool/stock(s)三类变量合并为一个模式，只需扫描一遍script
+_STOCK_VAR_RE = re.compile(r'var\s+\w*(?:data|pool|stocks?)\w*\s*=\s*(\[\s*\{.*?\}\s*\])', re.DOTALL)
+
+# akshare实时行情列名到股票字段的映射，以及输出字段顺序
+_AKSHARE_COLUMNS = {
+    '代码': 'code',
+    '名称': 'name',
+    '最新价': 'price',
+    '涨跌幅': 'change_rate',
+    '流通市值': 'market_value',
+    '换手率': 'turnover_rate',
+    '市盈率': 'pe_ratio'
+}
+_AKSHARE_FIELDS = [
+    'code', 'name', 'price', 'change_rate', 'lianban_days', 'is_new_stock',
+    'first_limit_time', 'last_limit_time', 'limit_type', 'fund_inflow',
+    'market_value', 'turnover_rate', 'pe_ratio', 'is_st', 'update_time'
+]
+
 # 尝试导入akshare库，如果未安装则使用备用方法
 AKSHARE_AVAILABLE = False
 try:
@@ -25,43 +143,173 @@ try:
 except ImportError:
     logger.warning("akshare库未安装，将使用备用方法")
 
-def scrape_lianban_stocks():
+# 优先使用lxml解析网页，未安装时使用BeautifulSoup自带的html.parser
+LXML_AVAILABLE = False
+try:
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    logger.info("lxml库未安装，使用html.parser解析网页")
+
+# 尝试导入redis库，用于缓存爬取结果，未安装时直接爬取
+REDIS_AVAILABLE = False
+try:
+    import redis
+    _REDIS = redis.Redis.from_url(
+        os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+        decode_responses=True,
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5
+    )
+    REDIS_AVAILABLE = True
+except ImportError:
+    logger.info("redis库未安装，不使用缓存")
+
+# 缓存键前缀
+_CACHE_PREFIX = 'lb:'
+
+def _cache_ttl() -> int:
     """
-    从东方财富网爬取连板股票数据
+    缓存有效期：交易时段60秒，非交易时段到下一个交易日09:15开盘为止，最长24小时
     """
-    logger.info("开始爬取连板股票数据...")
+    now = datetime.now()
+    if now.weekday() < 5 and '09:15' <= now.strftime('%H:%M') < '15:00':
+        return 60
     
-    # 优先使用akshare库获取数据
-    if AKSHARE_AVAILABLE:
+    # 下一个交易日的开盘时间（不考虑节假日）
+    next_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
+    if next_open <= now:
+        next_open += timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return max(60, min(24 * 60 * 60, int((next_open - now).total_seconds())))
+
+def _disable_cache(e: Exception):
+    """
+    Redis不可用时关闭缓存，避免后续请求反复等待连接超时
+    """
+    global REDIS_AVAILABLE
+    REDIS_AVAILABLE = False
+    logger.warning(f"Redis缓存不可用，直接爬取: {e}")
+
+def redis_cached(func):
+    """
+    使用Redis缓存爬取结果，键由函数名和参数哈希组成；Redis异常时直接调用原函数
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not REDIS_AVAILABLE:
+            return func(*args, **kwargs)
+        
+        params = json.dumps([args, kwargs], sort_keys=True, default=str)
+        key = f"{_CACHE_PREFIX}{func.__name__}:{hashlib.md5(params.encode()).hexdigest()}"
+        
         try:
-            stocks = scrape_lianban_with_akshare()
-            if stocks:
-                return stocks
-        except Exception as e:
-            logger.warning(f"akshare获取数据失败: {e}，使用备用方法")
+            cached = _REDIS.get(key)
+        except redis.RedisError as e:
+            _disable_cache(e)
+            return func(*args, **kwargs)
+        
+        if cached:
+            try:
+                result = json_io.loads(cached)
+                logger.info(f"使用缓存数据: {func.__name__}")
+                return result
+            except ValueError as e:
+                # 缓存内容无法解析时视为未命中，删除后重新爬取
+                logger.warning(f"缓存数据解析失败，重新爬取: {e}")
+                try:
+                    _REDIS.delete(key)
+                except redis.RedisError as e:
+                    _disable_cache(e)
+        
+        result = func(*args, **kwargs)
+        
+        # 只缓存非空结果
+        if result:
+            try:
+                _REDIS.setex(key, _cache_ttl(), json_io.dumps(result, indent=False))
+            except redis.RedisError as e:
+                _disable_cache(e)
+        
+        return result
+    return wrapper
+
+def clear_cache():
+    """
+    清除所有爬取结果缓存，用于手动刷新数据
+    """
+    if not REDIS_AVAILABLE:
+        return
     
-    # 备用方法1：使用API接口
     try:
-        stocks = scrape_lianban_stocks_api()
-        if stocks:
-            return stocks
+        keys = list(_REDIS.scan_iter(f"{_CACHE_PREFIX}*"))
+        if keys:
+            _REDIS.delete(*keys)
+        logger.info(f"已清除{len(keys)}条缓存")
+    except redis.RedisError as e:
+        _disable_cache(e)
+
+def _source_result(future, label: str) -> List[Dict]:
+    """
+    获取数据源任务的结果，失败时记录日志并返回空列表
+    """
+    try:
+        return future.result() or []
     except Exception as e:
-        logger.warning(f"API接口获取数据失败: {e}")
+        logger.warning(f"{label}获取数据失败: {e}")
+        return []
+
+def scrape_lianban_stocks():
+    """
+    从东方财富网爬取连板股票数据
+    """
+    logger.info("开始爬取连板股票数据...")
     
-    # 备用方法2：网页爬取
+    # 按优先级排列的数据源：akshare库、API接口、网页爬取
+    # 网页爬取与API接口同时进行，因此不再由网页爬取回退调用API接口，避免重复请求成分股接口
+    sources = [
+        ('API接口', scrape_lianban_stocks_api),
+        ('网页爬取', functools.partial(scrape_lianban_from_webpage, api_fallback=False))
+    ]
+    if AKSHARE_AVAILABLE:
+        sources.insert(0, ('akshare', scrape_lianban_with_akshare))
+    
+    executor = ThreadPoolExecutor(max_workers=len(sources))
     try:
-        stocks = scrape_lianban_from_webpage()
-        if stocks:
-            return stocks
-    except Exception as e:
-        logger.error(f"所有方法都失败: {e}")
+        # 主数据源在限定时间内成功返回时，不再请求备用数据源
+        label, source = sources[0]
+        futures = [(label, executor.submit(source))]
+        done, _ = wait([futures[0][1]], timeout=_PRIMARY_DEADLINE)
+        if done:
+            stocks = _source_result(futures[0][1], label)
+            if stocks:
+                return stocks
+            logger.info(f"{label}未获取到数据，使用备用方法")
+        else:
+            logger.info(f"{label}未在{_PRIMARY_DEADLINE}秒内返回，同时使用备用方法")
+        
+        for label, source in sources[1:]:
+            futures.append((label, executor.submit(source)))
+        
+        # 按优先级采用结果：高优先级数据源结束且没有数据时，才使用下一个数据源的结果
+        for label, future in futures[1 if done else 0:]:
+            stocks = _source_result(future, label)
+            if stocks:
+                return stocks
+        
+        logger.error("所有方法都失败")
         return []
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
+@redis_cached
 def scrape_lianban_with_akshare():
     """
     使用akshare库获取涨停股票数据
     """
     logger.info("使用akshare库获取涨停股票数据...")
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     try:
         # 获取A股实时数据
@@ -72,8 +320,9 @@ def scrape_lianban_with_akshare():
             logger.warning("akshare未返回A股数据")
             return []
         
-        # 筛选涨停股票（涨跌幅 >= 9.9%）
-        limit_up_stocks = stock_data[stock_data['涨跌幅'] >= 9.9]
+        # 筛选涨停股票（涨跌幅 >= 9.9%），只复制需要的列
+        columns = stock_data.columns.intersection(list(_AKSHARE_COLUMNS), sort=False)
+        limit_up_stocks = stock_data.loc[stock_data['涨跌幅'].to_numpy() >= 9.9, columns]
         
         if limit_up_stocks.empty:
             logger.warning("未找到涨停股票")
@@ -81,26 +330,25 @@ def scrape_lianban_with_akshare():
         
         logger.info(f"找到{len(limit_up_stocks)}只涨停股票")
         
-        stocks = []
-        for _, row in limit_up_stocks.iterrows():
-            stock = {
-                'code': str(row.get('代码', '')),
-                'name': row.get('名称', ''),
-                'price': float(row.get('最新价', 0)),
-                'change_rate': float(row.get('涨跌幅', 0)),
-                'lianban_days': 1,  # 默认1天，需要额外信息
-                'is_new_stock': False,
-                'first_limit_time': '',
-                'last_limit_time': '',
-                'limit_type': '涨停',
-                'fund_inflow': 0,  # 实时数据不包含资金流向
-                'market_value': float(row.get('流通市值', 0)),
-                'turnover_rate': float(row.get('换手率', 0)),
-                'pe_ratio': float(row.get('市盈率', 0)),
-                'is_st': 'ST' in str(row.get('名称', '')),
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            stocks.append(stock)
+        # 整列转换后一次性生成字典，避免iterrows逐行构造Series
+        df = limit_up_stocks.rename(columns=_AKSHARE_COLUMNS)
+        # 行情中缺少的列使用默认值（如接口只提供“市盈率-动态”时市盈率为0），原有空值保持不变
+        numeric_columns = ['price', 'change_rate', 'market_value', 'turnover_rate', 'pe_ratio']
+        for column in _AKSHARE_COLUMNS.values():
+            if column not in df.columns:
+                df[column] = 0 if column in numeric_columns else ''
+        df['code'] = df['code'].fillna('').astype(str)
+        df['name'] = df['name'].fillna('')
+        df[numeric_columns] = df[numeric_columns].astype(float)
+        df['lianban_days'] = 1  # 默认1天，需要额外信息
+        df['is_new_stock'] = False
+        df['first_limit_time'] = ''
+        df['last_limit_time'] = ''
+        df['limit_type'] = '涨停'
+        df['fund_inflow'] = 0  # 实时数据不包含资金流向
+        df['is_st'] = df['name'].astype(str).str.contains('ST', regex=False)
+        df['update_time'] = now
+        stocks = df[_AKSHARE_FIELDS].to_dict('records')
         
         logger.info(f"akshare成功获取{len(stocks)}只涨停股票")
         return stocks
@@ -146,7 +394,7 @@ def scrape_lianban_with_akshare():
                     'turnover_rate': float(row.get('换手率', 0)),
                     'pe_ratio': float(row.get('动态市盈率', 0)),
                     'is_st': False,
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'update_time': now
                 }
                 stocks.append(stock)
         
@@ -157,48 +405,58 @@ def scrape_lianban_with_akshare():
         logger.error(f"akshare获取数据失败: {e}")
         return []
 
-def scrape_lianban_from_webpage():
+def _extract_scripts(content: bytes) -> List[str]:
+    """
+    提取网页中所有script标签的文本内容
+    
+    Args:
+        content: 网页原始内容
+    
+    Returns:
+        非空的script文本列表
+    """
+    if LXML_AVAILABLE:
+        return [text for text in lxml_html.fromstring(content).xpath('//script/text()') if text]
+    
+    soup = BeautifulSoup(content, 'html.parser')
+    return [script.string for script in soup.find_all('script') if script.string]
+
+@redis_cached
+def scrape_lianban_from_webpage(api_fallback: bool = True):
     """
     从东方财富网页爬取连板股票数据
+    
+    Args:
+        api_fallback: 网页中未找到股票数据时是否改用API接口获取
     """
     try:
         # 东方财富网昨日连板板块页面
         url = "https://data.eastmoney.com/bkzj/BK1051.html"
         
         headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Referer': 'https://data.eastmoney.com/',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive'
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
         }
         
         # 发送请求获取页面
-        response = requests.get(url, headers=headers, timeout=10)
+        response = _SESSION.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         
-        # 解析HTML页面
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # 查找JavaScript中的股票数据
+        # 解析HTML页面，查找JavaScript中的股票数据
         stocks = []
-        
-        # 查找包含股票数据的JavaScript
-        scripts = soup.find_all('script')
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        scripts = _extract_scripts(response.content)
         logger.info(f"找到{len(scripts)}个script标签")
         
         # 查找包含股票数据的JavaScript变量
         stock_data_found = False
-        for script in scripts:
-            if script.string and ('data' in script.string or '股票' in script.string or '代码' in script.string):
-                script_content = script.string
+        for script_content in scripts:
+            if 'data' in script_content or '股票' in script_content or '代码' in script_content:
                 logger.info(f"找到可能包含数据的script，长度: {len(script_content)}")
                 
                 # 尝试提取JavaScript中的股票数据
                 # 查找类似 var data = [...] 的模式
-                data_pattern = r'var\s+\w*data\w*\s*=\s*(\[.*?\]);'
-                matches = re.findall(data_pattern, script_content, re.DOTALL)
+                matches = _DATA_VAR_RE.findall(script_content)
                 
                 if matches:
                     logger.info(f"找到{len(matches)}个数据变量")
@@ -209,22 +467,30 @@ def scrape_lianban_from_webpage():
                             if isinstance(data, list) and len(data) > 0:
                                 logger.info(f"解析到数据列表，长度: {len(data)}")
                                 # 检查是否包含股票数据
-                                if self._is_stock_data(data):
-                                    stocks.extend(self._parse_stock_list(data))
+                                if _is_stock_data(data):
+                                    stocks.extend(_parse_stock_list(data, now))
                                     stock_data_found = True
+                                    break
                         except json.JSONDecodeError:
                             continue
                 
                 # 查找其他可能的数据格式
                 if not stock_data_found:
                     # 尝试查找包含股票代码的模式
-                    stock_code_pattern = r'\[\s*\{\s*"[^"]*code[^"]*"\s*:\s*"\d{6}"'
-                    if re.search(stock_code_pattern, script_content):
+                    if _STOCK_CODE_RE.search(script_content):
                         logger.info("找到可能的股票数据格式")
                         # 尝试提取和解析
-                        self._extract_stock_data_from_script(script_content, stocks)
+                        _extract_stock_data_from_script(script_content, stocks, now)
+                        stock_data_found = len(stocks) > 0
+                
+                # 股票数据只在一个script中，找到后不再扫描其余script
+                if stock_data_found:
+                    break
                         
         if not stock_data_found:
+            if not api_fallback:
+                logger.info("未在JavaScript中找到股票数据")
+                return []
             logger.info("未在JavaScript中找到股票数据，尝试直接调用数据接口...")
             # 使用备用方法：调用数据接口
             return scrape_lianban_stocks_api()
@@ -239,7 +505,7 @@ def scrape_lianban_from_webpage():
         logger.error(f"网页爬取失败: {e}")
         return []
 
-def _is_stock_data(self, data):
+def _is_stock_data(data):
     """检查数据是否为股票数据"""
     if not isinstance(data, list) or len(data) == 0:
         return False
@@ -252,19 +518,24 @@ def _is_stock_data(self, data):
     
     return False
 
-def _parse_stock_list(self, data):
+def _parse_stock_list(data, now=None):
     """解析股票数据列表"""
+    if now is None:
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     stocks = []
     for item in data:
         if isinstance(item, dict):
-            stock = self._parse_stock_item(item)
+            stock = _parse_stock_item(item, now)
             if stock:
                 stocks.append(stock)
     return stocks
 
-def _parse_stock_item(self, item):
+def _parse_stock_item(item, now=None):
     """解析单个股票数据"""
     try:
+        if now is None:
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
         # 尝试不同的字段映射
         code = (item.get('code') or item.get('codes') or 
                 item.get('股票代码') or item.get('代码') or 
@@ -298,33 +569,25 @@ def _parse_stock_item(self, item):
             'turnover_rate': float(item.get('turnover_rate') or item.get('换手率') or 0),
             'pe_ratio': float(item.get('pe_ratio') or item.get('市盈率') or 0),
             'is_st': False,
-            'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'update_time': now
         }
     except (ValueError, KeyError) as e:
         logger.warning(f"解析股票数据失败: {e}")
         return None
 
-def _extract_stock_data_from_script(self, script_content, stocks):
+def _extract_stock_data_from_script(script_content, stocks, now=None):
     """从JavaScript内容中提取股票数据"""
     try:
         # 尝试查找JSON格式的数据
-        json_patterns = [
-            r'var\s+\w*data\w*\s*=\s*(\[\s*\{.*?\}\s*\])',
-            r'var\s+\w*pool\w*\s*=\s*(\[\s*\{.*?\}\s*\])',
-            r'var\s+\w*stocks?\w*\s*=\s*(\[\s*\{.*?\}\s*\])'
-        ]
-        
-        for pattern in json_patterns:
-            matches = re.findall(pattern, script_content, re.DOTALL)
-            for match in matches:
-                try:
-                    data = json.loads(match)
-                    if isinstance(data, list):
-                        parsed_stocks = self._parse_stock_list(data)
-                        stocks.extend(parsed_stocks)
-                        logger.info(f"从script中提取到{len(parsed_stocks)}只股票")
-                except json.JSONDecodeError:
-                    continue
+        for match in _STOCK_VAR_RE.findall(script_content):
+            try:
+                data = json.loads(match)
+                if isinstance(data, list):
+                    parsed_stocks = _parse_stock_list(data, now)
+                    stocks.extend(parsed_stocks)
+                    logger.info(f"从script中提取到{len(parsed_stocks)}只股票")
+            except json.JSONDecodeError:
+                continue
                     
     except Exception as e:
         logger.warning(f"从script提取数据失败: {e}")
@@ -354,41 +617,48 @@ def scrape_lianban_stocks_api():
         logger.error(f"API获取连板股票数据失败: {e}")
         return
 
+def _to_float(value) -> float:
+    """
+    将API返回的数值转换为浮点数，空值视为0，非数值（如'-'）抛出ValueError
+    """
+    if value is None:
+        return 0.0
+    return float(value)
+
+def _fetch_stock_list_page(page: int) -> Dict:
+    """
+    获取昨日连板板块成分股列表的指定页
+    """
+    params = dict(_STOCK_LIST_PARAMS, pn=page)
+    with _REQUEST_SEMAPHORE:
+        response = _SESSION.get(_STOCK_LIST_URL, params=params, headers=_STOCK_LIST_HEADERS, timeout=10)
+    response.raise_for_status()
+    return json_io.loads(response.content)
+
+def _fetch_stock_list_rows(page: int) -> List[Dict]:
+    """
+    获取成分股列表指定页的股票数据，请求或解析失败时记录日志并返回空列表，不影响其他页
+    """
+    try:
+        data = _fetch_stock_list_page(page)
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"获取成分股第{page}页失败: {e}")
+        return []
+    
+    if data.get('rc') != 0:
+        logger.warning(f"成分股第{page}页API返回错误码: {data.get('rc')}")
+        return []
+    
+    return (data.get('data') or {}).get('diff') or []
+
+@redis_cached
 def scrape_lianban_stocks_list():
     """
     获取昨日连板板块的成分股列表
     """
     try:
-        # 东方财富板块成分股API
-        url = "http://push2.eastmoney.com/api/qt/clist/get"
-        
-        params = {
-            'pn': 1,  # 页码
-            'pz': 100,  # 每页数量
-            'po': 1,  # 升序
-            'np': 1,  # 
-            'ut': 'bd1d9ddb04089700cf9c27f6f7426281',  # 固定参数
-            'fltt': 2,  # 
-            'invt': 2,  # 
-            'fid': 'f3',  # 按涨跌幅排序
-            'fs': 'b:BK1051',  # 昨日连板板块代码
-            'fields': 'f1,f2,f3,f4,f5,f6,f7,f8,f9,f10,f12,f13,f14,f15,f16,f17,f18,f20,f21,f22,f23,f24,f25,f26,f27,f28,f29,f30,f31,f32,f33,f34,f35,f36,f37,f38,f39,f40,f41,f42,f43,f44,f45,f46,f47,f48,f49,f50,f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61,f62,f63,f64,f65,f66,f67,f68,f69,f70,f71,f72,f73,f74,f75,f76,f77,f78,f79,f80,f81,f82,f83,f84,f85,f86,f87,f88,f89,f90,f91,f92,f93,f94,f95,f96,f97,f98,f99,f100,f101,f102,f103,f104,f105,f106,f107,f108,f109,f110,f111,f112,f113,f114,f115,f116,f117,f118,f119,f120,f121,f122,f123,f124,f125,f126,f127,f128,f129,f130,f131,f132,f133,f134,f135,f136,f137,f138,f139,f140,f141,f142,f143,f144,f145,f146,f147,f148,f149,f150,f151,f152,f153,f154,f155,f156,f157,f158,f159,f160,f161,f162,f163,f164,f165,f166,f167,f168,f169,f170,f171,f172,f173,f174,f175,f176,f177,f178,f179,f180,f181,f182,f183,f184,f185,f186,f187,f188,f189,f190,f191,f192,f193,f194,f195,f196,f197,f198,f199,f200'
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://data.eastmoney.com/bkzj/BK1051.html',
-            'Accept': '*/*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive'
-        }
-        
-        # 发送请求
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
+        # 获取第一页，确定成分股总数
+        data = _fetch_stock_list_page(1)
         
         if data.get('rc') != 0:
             logger.info(f"API返回错误码: {data.get('rc')}")
@@ -398,41 +668,36 @@ def scrape_lianban_stocks_list():
             logger.info("API返回数据为空")
             return []
         
+        stock_list = list(data['data']['diff'])
+        
+        # 其余页并发获取
+        total = data['data'].get('total') or len(stock_list)
+        total_pages = -(-total // _STOCK_LIST_PAGE_SIZE)
+        if total_pages > 1:
+            logger.info(f"成分股共{total}只，分{total_pages}页获取")
+            with ThreadPoolExecutor(max_workers=min(_MAX_CONCURRENT_PAGES, total_pages - 1)) as executor:
+                for rows in executor.map(_fetch_stock_list_rows, range(2, total_pages + 1)):
+                    stock_list.extend(rows)
+        
         # 提取股票数据
-        stocks = []
-        stock_list = data['data']['diff']
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         logger.info(f"API返回{len(stock_list)}只股票数据")
         
+        stocks = []
         for stock_data in stock_list:
             try:
-                stock = {
-                    'code': stock_data.get('f12', ''),
-                    'name': stock_data.get('f14', ''),
-                    'price': float(stock_data.get('f2', 0)),
-                    'change_rate': float(stock_data.get('f3', 0)),
-                    'change_amount': float(stock_data.get('f4', 0)),
-                    'volume': float(stock_data.get('f5', 0)),
-                    'amount': float(stock_data.get('f6', 0)),
-                    'amplitude': float(stock_data.get('f7', 0)),
-                    'turnover_rate': float(stock_data.get('f8', 0)),
-                    'pe_ratio': float(stock_data.get('f39', 0)),
-                    'pb_ratio': float(stock_data.get('f46', 0)),
-                    'market_value': float(stock_data.get('f20', 0)),
-                    'fund_inflow': 0,  # 需要其他接口获取
-                    'lianban_days': 1,  # 默认1天，需要其他接口获取真实连板天数
-                    'is_new_stock': False,
-                    'first_limit_time': '',
-                    'last_limit_time': '',
-                    'limit_type': '连板',
-                    'is_st': False,
-                    'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                stocks.append(stock)
-                
-            except (ValueError, KeyError) as e:
+                # 停牌等情况下数值字段为'-'，无法转换时跳过该股票
+                values = [_to_float(value) for value in map(stock_data.get, _STOCK_LIST_NUMERIC_IDS)]
+            except (ValueError, TypeError) as e:
                 logger.warning(f"解析股票数据失败: {e}")
                 continue
+            
+            stock = {'code': stock_data.get('f12') or '', 'name': stock_data.get('f14') or ''}
+            stock.update(zip(_STOCK_LIST_NUMERIC, values))
+            stock.update(_STOCK_LIST_DEFAULTS)
+            stock['update_time'] = now
+            stocks.append(stock)
         
         logger.info(f"成功获取{len(stocks)}只连板股票数据")
         return stocks
@@ -451,70 +716,60 @@ def filter_stocks(stocks: List[Dict]) -> List[Dict]:
     """
     过滤掉ST、*ST股票和其他不符合条件的股票
     """
-    filtered_stocks = []
+    filtered_stocks = [stock for stock in stocks if _keep_stock(stock)]
     
-    for stock in stocks:
-        name = stock.get('name', '')
-        code = stock.get('code', '')
+    logger.info(f"过滤后剩余{len(filtered_stocks)}只股票")
+    return filtered_stocks
+
+def _keep_stock(stock: Dict) -> bool:
+    """
+    检查单只股票是否满足筛选条件，满足时标记为非ST股票
+    """
+    name = stock.get('name', '')
+    code = stock.get('code', '')
+    
+    # 1. 过滤ST股票（名称包含ST或*ST）
+    if _ST_RE.search(name):
+        logger.info(f"过滤ST股票: {code} {name}")
+        return False
         
-        # 过滤条件
-        filters_passed = True
+    # 2. 过滤名称中包含特殊字符的股票
+    if _SPECIAL_CHAR_RE.search(name):
+        logger.info(f"过滤特殊字符股票: {code} {name}")
+        return False
         
-        # 1. 过滤ST股票（名称包含ST或*ST）
-        if re.search(r'\*?ST', name, re.IGNORECASE):
-            logger.info(f"过滤ST股票: {code} {name}")
-            filters_passed = False
-            continue
-            
-        # 2. 过滤名称中包含特殊字符的股票
-        if re.search(r'[\*\?\!]', name):
-            logger.info(f"过滤特殊字符股票: {code} {name}")
-            filters_passed = False
-            continue
-            
-        # 3. 过滤价格异常的股票（价格为0或负数）
-        if stock.get('price', 0) <= 0:
-            logger.info(f"过滤价格异常股票: {code} {name}")
-            filters_passed = False
-            continue
-            
-        # 4. 过滤涨跌幅异常的股票（涨跌幅超过20%）
-        if abs(stock.get('change_rate', 0)) > 20:
-            logger.info(f"过滤涨跌幅异常股票: {code} {name} (涨跌幅: {stock.get('change_rate', 0)}%)")
-            filters_passed = False
-            continue
-            
-        # 5. 过滤连板天数为0的股票（确保是真正的连板股）
-        if stock.get('lianban_days', 0) <= 0:
-            logger.info(f"过滤非连板股票: {code} {name}")
-            filters_passed = False
-            continue
+    # 3. 过滤价格异常的股票（价格为0或负数）
+    if stock.get('price', 0) <= 0:
+        logger.info(f"过滤价格异常股票: {code} {name}")
+        return False
+        
+    # 4. 过滤涨跌幅异常的股票（涨跌幅超过20%）
+    change_rate = stock.get('change_rate', 0)
+    if abs(change_rate) > 20:
+        logger.info(f"过滤涨跌幅异常股票: {code} {name} (涨跌幅: {change_rate}%)")
+        return False
         
-        if filters_passed:
-            # 标记为非ST股票
-            stock['is_st'] = False
-            filtered_stocks.append(stock)
+    # 5. 过滤连板天数为0的股票（确保是真正的连板股）
+    if stock.get('lianban_days', 0) <= 0:
+        logger.info(f"过滤非连板股票: {code} {name}")
+        return False
     
-    logger.info(f"过滤后剩余{len(filtered_stocks)}只股票")
-    return filtered_stocks
+    # 标记为非ST股票
+    stock['is_st'] = False
+    return True
 
 def enhance_stock_data(stocks: List[Dict]) -> List[Dict]:
     """
-    增强股票数据，添加更多有用的信息
+    增强股票数据，添加更多有用的信息；计算字段直接写入原股票数据
     """
-    enhanced_stocks = []
-    
     for stock in stocks:
-        # 创建增强版本的股票数据
-        enhanced_stock = stock.copy()
-        
         # 添加计算字段
-        enhanced_stock['limit_intensity'] = enhanced_stock['change_rate'] / 10.0  # 涨停强度
-        enhanced_stock['fund_efficiency'] = enhanced_stock['fund_inflow'] / enhanced_stock['market_value'] if enhanced_stock['market_value'] > 0 else 0  # 资金效率
+        stock['limit_intensity'] = stock['change_rate'] / 10.0  # 涨停强度
+        stock['fund_efficiency'] = stock['fund_inflow'] / stock['market_value'] if stock['market_value'] > 0 else 0  # 资金效率
         
         # 添加风险等级（基于连板天数和换手率）
-        lianban_days = enhanced_stock['lianban_days']
-        turnover_rate = enhanced_stock['turnover_rate']
+        lianban_days = stock['lianban_days']
+        turnover_rate = stock['turnover_rate']
         
         if lianban_days >= 5 and turnover_rate > 20:
             risk_level = "高风险"
@@ -525,12 +780,10 @@ def enhance_stock_data(stocks: List[Dict]) -> List[Dict]:
         else:
             risk_level = "低风险"
         
-        enhanced_stock['risk_level'] = risk_level
-        enhanced_stock['selection_reason'] = f"连板{enhanced_stock['lianban_days']}天，{risk_level}"
-        
-        enhanced_stocks.append(enhanced_stock)
+        stock['risk_level'] = risk_level
+        stock['selection_reason'] = f"连板{lianban_days}天，{risk_level}"
     
-    return enhanced_stocks
+    return stocks
 
 def save_to_json(stocks: List[Dict], output_file: str):
     """
@@ -548,21 +801,26 @@ def save_to_json(stocks: List[Dict], output_file: str):
         # 确保目录存在
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        # 保存到JSON文件
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        # 保存到JSON文件，写入过程中读取方不会看到不完整的文件
+        json_io.atomic_write_bytes(output_file, json_io.dumps(output_data))
         
         logger.info(f"成功保存{len(stocks)}只股票数据到 {output_file}")
         
     except Exception as e:
         logger.error(f"保存JSON文件失败: {e}")
 
-def main():
+def main(refresh: bool = False):
     """
     主函数
+    
+    Args:
+        refresh: 是否清除缓存后重新爬取
     """
     logger.info("连板股票数据爬取程序启动")
     
+    if refresh:
+        clear_cache()
+    
     # 爬取连板股票数据
     raw_stocks = scrape_lianban_stocks()
     
@@ -589,24 +847,14 @@ def main():
     logger.info(f"总股票数: {len(enhanced_stocks)}")
     
     # 按连板天数分组统计
-    lianban_stats = {}
-    for stock in enhanced_stocks:
-        days = stock['lianban_days']
-        if days not in lianban_stats:
-            lianban_stats[days] = 0
-        lianban_stats[days] += 1
+    lianban_stats = Counter(stock['lianban_days'] for stock in enhanced_stocks)
     
     logger.info("连板天数分布:")
     for days, count in sorted(lianban_stats.items()):
         logger.info(f"  连板{days}天: {count}只")
     
     # 按风险等级统计
-    risk_stats = {}
-    for stock in enhanced_stocks:
-        risk = stock['risk_level']
-        if risk not in risk_stats:
-            risk_stats[risk] = 0
-        risk_stats[risk] += 1
+    risk_stats = Counter(stock['risk_level'] for stock in enhanced_stocks)
     
     logger.info("风险等级分布:")
     for risk, count in risk_stats.items():
@@ -615,4 +863,6 @@ def main():
     logger.info("连板股票数据爬取完成")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="连板股票数据爬取")
+    parser.add_argument('--refresh', action='store_true', help="清除缓存后重新爬取")
+    main(refresh=parser.parse_args().refresh)
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+连板股票爬取中网页script解析路径的测试
+"""
+import unittest
+from unittest import mock
+
+import lianban_scraper
+
+
+def _mock_response(html: str):
+    """构造只包含页面内容的模拟响应"""
+    response = mock.Mock()
+    response.content = html.encode('utf-8')
+    response.raise_for_status.return_value = None
+    return response
+
+
+class ScrapeFromWebpageTest(unittest.TestCase):
+    def setUp(self):
+        # 不使用Redis缓存，保证每次都解析模拟页面
+        patcher = mock.patch.object(lianban_scraper, 'REDIS_AVAILABLE', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _scrape(self, html: str, **kwargs):
+        with mock.patch.object(lianban_scraper._SESSION, 'get', return_value=_mock_response(html)), \
+                mock.patch.object(lianban_scraper, 'scrape_lianban_stocks_api', return_value=[]) as api:
+            stocks = lianban_scraper.scrape_lianban_from_webpage(**kwargs)
+        return stocks, api
+
+    def test_parses_data_variable(self):
+        html = (
+            '<html><script>var stockdata = [{"code": "600001", "name": "测试A", '
+            '"price": "10.5", "zdp": 9.98, "连板天数": 3}];</script></html>'
+        )
+        stocks, api = self._scrape(html)
+
+        self.assertEqual(len(stocks), 1)
+        self.assertEqual(stocks[0]['code'], '600001')
+        self.assertEqual(stocks[0]['name'], '测试A')
+        self.assertEqual(stocks[0]['price'], 10.5)
+        self.assertEqual(stocks[0]['change_rate'], 9.98)
+        self.assertEqual(stocks[0]['lianban_days'], 3)
+        api.assert_not_called()
+
+    def test_extracts_stock_variable_from_script(self):
+        # 不符合 var xxxdata = [...]; 的写法，由 _extract_stock_data_from_script 解析
+        html = (
+            '<html><script>// 股票池\n'
+            'var stockpool = [{"code": "000002", "name": "测试B", "f2": 5.2}]\n'
+            '</script></html>'
+        )
+        stocks, api = self._scrape(html)
+
+        self.assertEqual([stock['code'] for stock in stocks], ['000002'])
+        self.assertEqual(stocks[0]['price'], 5.2)
+        api.assert_not_called()
+
+    def test_falls_back_to_api_without_stock_data(self):
+        html = '<html><script>var data = [1, 2, 3];</script></html>'
+
+        stocks, api = self._scrape(html)
+        self.assertEqual(stocks, [])
+        api.assert_called_once_with()
+
+        stocks, api = self._scrape(html, api_fallback=False)
+        self.assertEqual(stocks, [])
+        api.assert_not_called()
+
+
+class ExtractStockDataFromScriptTest(unittest.TestCase):
+    def test_appends_parsed_stocks(self):
+        script = 'var pool = [{"f12": "300001", "f14": "测试C"}, {"f12": "", "f14": "无代码"}]'
+        stocks = []
+
+        lianban_scraper._extract_stock_data_from_script(script, stocks, '2024-01-02 15:00:00')
+
+        self.assertEqual(len(stocks), 1)
+        self.assertEqual(stocks[0]['code'], '300001')
+        self.assertEqual(stocks[0]['update_time'], '2024-01-02 15:00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()